@@ -0,0 +1,38 @@
+# cython: boundscheck=False, wraparound=False, cdivision=True
+"""Fused transform/center/downcast kernels for mesh extraction.
+
+Build in place with:
+
+    python setup_ext.py build_ext --inplace
+
+occserver imports this module if the compiled extension is present and falls
+back to the NumPy path otherwise. Each kernel makes a single pass over the
+node array, writing float32 output directly instead of materializing the
+intermediate float64 arrays that `nodes @ R.T + t - center` produces.
+"""
+
+def transform_pack(double[:, ::1] nodes, double[:, ::1] rotation,
+                   double[::1] shift, float[:, ::1] out):
+    """Write (nodes @ rotation.T + shift) into the float32 out buffer."""
+    cdef Py_ssize_t i, n = nodes.shape[0]
+    cdef double x, y, z
+    cdef double r00 = rotation[0, 0], r01 = rotation[0, 1], r02 = rotation[0, 2]
+    cdef double r10 = rotation[1, 0], r11 = rotation[1, 1], r12 = rotation[1, 2]
+    cdef double r20 = rotation[2, 0], r21 = rotation[2, 1], r22 = rotation[2, 2]
+    cdef double s0 = shift[0], s1 = shift[1], s2 = shift[2]
+    for i in range(n):
+        x = nodes[i, 0]
+        y = nodes[i, 1]
+        z = nodes[i, 2]
+        out[i, 0] = <float>(r00 * x + r01 * y + r02 * z + s0)
+        out[i, 1] = <float>(r10 * x + r11 * y + r12 * z + s1)
+        out[i, 2] = <float>(r20 * x + r21 * y + r22 * z + s2)
+
+def shift_pack(double[:, ::1] nodes, double[::1] shift, float[:, ::1] out):
+    """Write (nodes + shift) into the float32 out buffer (identity rotation)."""
+    cdef Py_ssize_t i, n = nodes.shape[0]
+    cdef double s0 = shift[0], s1 = shift[1], s2 = shift[2]
+    for i in range(n):
+        out[i, 0] = <float>(nodes[i, 0] + s0)
+        out[i, 1] = <float>(nodes[i, 1] + s1)
+        out[i, 2] = <float>(nodes[i, 2] + s2)
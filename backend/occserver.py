@@ -4,9 +4,10 @@ Enhanced Python STEP file processor using PythonOCC
 Now includes STL export storage functionality and RANSAC shape recognition
 """
 
-from flask import Flask, request, jsonify, send_from_directory, send_file, render_template
+from flask import Flask, request, jsonify, send_from_directory, send_file, render_template, Response
 from flask_cors import CORS
 import os
+import shutil
 import tempfile
 import time
 import json
@@ -15,8 +16,13 @@ import uuid
 import base64
 from werkzeug.utils import secure_filename
 from datetime import datetime
+import atexit
 import math
+import threading
 import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
 
 # --- NEW IMPORTS FOR RANSAC ---
 import numpy as np
@@ -27,6 +33,18 @@ except ImportError:
     Cylinder = None
 # --- END NEW IMPORTS ---
 
+try:
+    from numba import njit, prange
+    from numba.typed import List as NumbaList
+except ImportError:
+    print("WARNING: numba not installed. Mesh packing will use the NumPy fallback.")
+    njit = None
+
+try:
+    import _mesh_ext  # compiled Cython kernels; see setup_ext.py
+except ImportError:
+    _mesh_ext = None
+
 
 # PythonOCC imports
 from OCC.Core.STEPControl import STEPControl_Reader
@@ -58,9 +76,90 @@ EXPORTS_FOLDER = 'exports'
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 ALLOWED_EXTENSIONS = {'.step', '.stp', '.iges', '.igs'}
 
+# Linear deflection as a fraction of the bounding-box diagonal, per quality level
+QUALITY_MULTIPLIERS = {'low': 5e-3, 'med': 1e-3, 'high': 2e-4}
+DEFAULT_QUALITY = 'med'
+
+# Reject oversized uploads before Werkzeug buffers them
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+
 # In-memory storage for CAD objects
 scene_objects = {}
 
+# Cached face-local triangulation arrays keyed by shape_id. Rigid transforms
+# (shape.Move) only update the TopLoc_Location, so the cached node arrays stay
+# valid and transforms can skip the expensive BRepMesh_IncrementalMesh pass.
+shape_mesh_cache = {}
+
+# Per-face surface properties and world-space vertices from the last
+# extraction, keyed by shape_id then face_id. Lets recognize_shape answer
+# analytically for faces the STEP importer already classified.
+shape_faces_cache = {}
+
+# View-space centering offset per shape, fixed at first extraction. Shapes are
+# no longer physically Move()d to the origin; the offset is subtracted from
+# the extracted vertices instead, which fuses centering into the mesh copy.
+shape_center_offset = {}
+
+# Shared-memory arenas holding each shape's packed vertex/index buffers so
+# repeat extractions reuse the allocation and subprocess workers can attach by
+# name instead of pickling the arrays.
+shape_shm_arenas = {}
+
+def invalidate_mesh_cache(shape_id):
+    """Drop a shape's cached triangulation when its topology changes (e.g. boolean ops)."""
+    shape_mesh_cache.pop(shape_id, None)
+    shape_faces_cache.pop(shape_id, None)
+
+def _release_arena(entry):
+    """Close and unlink a shared-memory arena, ignoring double-release races.
+
+    close() can raise BufferError while numpy views are still exported;
+    unlink() must run regardless so the /dev/shm segment doesn't leak.
+    """
+    try:
+        entry['shm'].close()
+    except Exception:
+        pass
+    try:
+        entry['shm'].unlink()
+    except Exception:
+        pass
+
+def _store_mesh_shared(shape_id, vertices, indices):
+    """Mirror packed buffers into the shape's shared-memory arena.
+
+    The arena is overallocated so re-extractions after transforms reuse it;
+    it only grows when a re-mesh produces more data than the current capacity.
+    The caller keeps its own private arrays: returning views into the arena
+    would let a concurrent re-extraction of the same shape overwrite them
+    mid-response under the threaded server.
+    """
+    needed = vertices.nbytes + indices.nbytes
+    if needed == 0:
+        return
+    entry = shape_shm_arenas.get(shape_id)
+    if entry is not None and entry['capacity'] < needed:
+        _release_arena(entry)
+        entry = None
+    if entry is None:
+        capacity = max(needed * 2, 1 << 20)
+        shm = shared_memory.SharedMemory(create=True, size=capacity)
+        entry = {'shm': shm, 'capacity': capacity}
+        shape_shm_arenas[shape_id] = entry
+    shm = entry['shm']
+    v_view = np.ndarray(vertices.shape, dtype=vertices.dtype, buffer=shm.buf)
+    v_view[:] = vertices
+    i_view = np.ndarray(indices.shape, dtype=indices.dtype, buffer=shm.buf, offset=vertices.nbytes)
+    i_view[:] = indices
+    entry['vertexCount'] = len(vertices)
+    entry['indexCount'] = len(indices)
+
+@atexit.register
+def _cleanup_arenas():
+    for entry in shape_shm_arenas.values():
+        _release_arena(entry)
+
 # Ensure directories exist
 for folder in [UPLOAD_FOLDER, STL_STORAGE_FOLDER, EXPORTS_FOLDER]:
     os.makedirs(folder, exist_ok=True)
@@ -87,101 +186,431 @@ def read_iges_file(file_path):
     iges_reader.TransferRoots()
     return iges_reader.OneShape()
 
-def center_shape(shape):
-    """Calculates the bounding box of a shape and moves its center to the origin."""
+def shape_bounds(shape):
+    """Compute a shape's bounding-box center and diagonal in a single pass."""
     bbox = Bnd_Box()
     brepbndlib.Add(shape, bbox)
     if bbox.IsVoid():
-        return shape # Cannot center a void shape
+        return np.zeros(3), 0.0
     xmin, ymin, zmin, xmax, ymax, zmax = bbox.Get()
-    center_x = (xmin + xmax) / 2.0
-    center_y = (ymin + ymax) / 2.0
-    center_z = (zmin + zmax) / 2.0
-    translation_vector = gp_Vec(-center_x, -center_y, -center_z)
-    transform = gp_Trsf()
-    transform.SetTranslation(translation_vector)
-    shape.Move(TopLoc_Location(transform))
-    print(f"Shape centered. Moved by {-center_x:.2f}, {-center_y:.2f}, {-center_z:.2f}")
-    return shape
-
-def extract_mesh_data(shape, shape_id=None):
+    center = np.array([(xmin + xmax) / 2.0, (ymin + ymax) / 2.0, (zmin + zmax) / 2.0])
+    diagonal = math.sqrt((xmax - xmin) ** 2 + (ymax - ymin) ** 2 + (zmax - zmin) ** 2)
+    return center, diagonal
+
+# Per-thread reusable gp_Trsf/gp_Vec scratch objects for transform-heavy
+# flows. The Set* methods redefine the whole transform and TopLoc_Location
+# copies it on construction, so reconfiguring in place is safe.
+_scratch = threading.local()
+
+def _scratch_trsf():
+    """Return this thread's reusable gp_Trsf."""
+    trsf = getattr(_scratch, 'trsf', None)
+    if trsf is None:
+        trsf = _scratch.trsf = gp_Trsf()
+    return trsf
+
+def _scratch_vec(x, y, z):
+    """Return this thread's reusable gp_Vec, set to (x, y, z)."""
+    vec = getattr(_scratch, 'vec', None)
+    if vec is None:
+        vec = _scratch.vec = gp_Vec()
+    vec.SetCoord(x, y, z)
+    return vec
+
+def _trsf_to_matrix(trsf):
+    """Extract a gp_Trsf into a (3x3 rotation, 3-vector translation) NumPy pair."""
+    rotation = np.array([[trsf.Value(i, j) for j in range(1, 4)] for i in range(1, 4)])
+    translation = np.array([trsf.Value(i, 4) for i in range(1, 4)])
+    return rotation, translation
+
+def _triangulation_nodes(triangulation):
+    """Copy all triangulation nodes into an (N, 3) float64 array in one pass."""
+    nb_nodes = triangulation.NbNodes()
+    if hasattr(triangulation, 'MapNodeArray'):
+        # OCCT 7.6+ exposes the node array directly
+        node_array = triangulation.MapNodeArray()
+        nodes = np.empty((nb_nodes, 3), dtype=np.float64)
+        for k in range(1, nb_nodes + 1):
+            pnt = node_array.Value(k)
+            nodes[k - 1] = (pnt.X(), pnt.Y(), pnt.Z())
+    else:
+        nodes = np.empty((nb_nodes, 3), dtype=np.float64)
+        for k in range(1, nb_nodes + 1):
+            pnt = triangulation.Node(k)
+            nodes[k - 1] = (pnt.X(), pnt.Y(), pnt.Z())
+    return nodes
+
+def _triangulation_triangles(triangulation):
+    """Copy all triangle node indices into an (M, 3) zero-based int array."""
+    nb_triangles = triangulation.NbTriangles()
+    triangles = np.empty((nb_triangles, 3), dtype=np.int64)
+    for k in range(1, nb_triangles + 1):
+        triangles[k - 1] = triangulation.Triangle(k).Get()
+    return triangles - 1
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _pack_faces_jit(vertex_blocks, index_blocks, vertex_offsets, index_offsets,
+                        total_vertices, total_indices):
+        out_vertices = np.empty((total_vertices, 3), np.float32)
+        out_indices = np.empty(total_indices, np.int32)
+        for f in prange(len(vertex_blocks)):
+            v_off = vertex_offsets[f]
+            block = vertex_blocks[f]
+            out_vertices[v_off:v_off + len(block)] = block
+            i_off = index_offsets[f]
+            idx = index_blocks[f]
+            for k in range(len(idx)):
+                out_indices[i_off + k] = idx[k] + v_off
+        return out_vertices, out_indices
+else:
+    _pack_faces_jit = None
+
+def _pack_faces(vertex_blocks, index_blocks):
+    """Concatenate per-face blocks into global buffers, remapping indices by vertex offset."""
+    if not vertex_blocks:
+        return np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=np.int32)
+    vertex_counts = np.array([len(v) for v in vertex_blocks], dtype=np.int64)
+    index_counts = np.array([len(i) for i in index_blocks], dtype=np.int64)
+    vertex_offsets = np.concatenate(([0], np.cumsum(vertex_counts)[:-1]))
+    index_offsets = np.concatenate(([0], np.cumsum(index_counts)[:-1]))
+    total_vertices = int(vertex_counts.sum())
+    total_indices = int(index_counts.sum())
+    # int32 indices cover anything a STEP file realistically produces; fail
+    # loudly rather than silently wrap if that assumption ever breaks.
+    if total_vertices >= 2 ** 31:
+        raise Exception(f"Mesh exceeds int32 index range: {total_vertices} vertices")
+    if _pack_faces_jit is not None:
+        return _pack_faces_jit(NumbaList(vertex_blocks), NumbaList(index_blocks),
+                               vertex_offsets, index_offsets,
+                               total_vertices, total_indices)
+    # Pre-size the output buffers from the summed counts; np.add writes the
+    # offset remap straight into each slice, so no per-face temporaries and no
+    # growth reallocations.
+    out_vertices = np.empty((total_vertices, 3), dtype=np.float32)
+    out_indices = np.empty(total_indices, dtype=np.int32)
+    for block, idx, v_off, i_off in zip(vertex_blocks, index_blocks, vertex_offsets, index_offsets):
+        out_vertices[v_off:v_off + len(block)] = block
+        np.add(idx, np.int32(v_off), out=out_indices[i_off:i_off + len(idx)])
+    return out_vertices, out_indices
+
+if _pack_faces_jit is not None:
+    # Pay the JIT compile cost once at import instead of on the first request.
+    _pack_faces([np.zeros((3, 3), np.float32)], [np.arange(3, dtype=np.int32)])
+
+def _process_face(face, cached, center=None):
+    """Extract one face's transformed vertex/index arrays and surface properties.
+
+    Runs on a worker thread; OCCT calls release the GIL so faces extract in
+    parallel. The triangulation must already be attached to the shape.
+    """
+    surface_props = {}
+    adaptor = BRepAdaptor_Surface(face, True)
+    surface_type = adaptor.GetType()
+
+    if surface_type == GeomAbs_Cylinder:
+        cylinder = adaptor.Cylinder()
+        axis = cylinder.Axis()
+        location_cyl = axis.Location()
+        direction = axis.Direction()
+        surface_props = {
+            'surfaceType': 'Cylinder',
+            'radius': cylinder.Radius(),
+            'center': [location_cyl.X(), location_cyl.Y(), location_cyl.Z()],
+            'axis': [direction.X(), direction.Y(), direction.Z()]
+        }
+    elif surface_type == GeomAbs_Plane:
+        surface_props = {'surfaceType': 'Plane'}
+    else:
+        surface_props = {'surfaceType': 'Other'}
+
+    location = TopLoc_Location()
+    triangulation = BRep_Tool.Triangulation(face, location)
+    if not triangulation:
+        return None
+
+    if cached is None:
+        nodes_local = _triangulation_nodes(triangulation)
+        triangles = _triangulation_triangles(triangulation)
+        # OCCT node numbering is dense per face, so normally every node is
+        # referenced. Guard against the rare sparse case: np.unique compacts
+        # unreferenced nodes out and remaps indices in one vectorized pass.
+        used, inverse = np.unique(triangles, return_inverse=True)
+        if len(used) != len(nodes_local):
+            nodes_local = nodes_local[used]
+            triangles = inverse.reshape(triangles.shape).astype(triangles.dtype)
+    else:
+        nodes_local, triangles = cached
+
+    if location.IsIdentity():
+        rotation, translation = None, None
+    else:
+        rotation, translation = _trsf_to_matrix(location.Transformation())
+    if center is not None and 'center' in surface_props:
+        # Centering fused into the extraction copy instead of a shape.Move
+        surface_props['center'] = (np.array(surface_props['center']) - center).tolist()
+
+    if _mesh_ext is not None:
+        # Compiled kernel: one pass over the nodes, float32 written directly
+        shift = np.zeros(3)
+        if translation is not None:
+            shift += translation
+        if center is not None:
+            shift -= center
+        face_vertices = np.empty((len(nodes_local), 3), dtype=np.float32)
+        if rotation is None:
+            _mesh_ext.shift_pack(nodes_local, shift, face_vertices)
+        else:
+            _mesh_ext.transform_pack(nodes_local, np.ascontiguousarray(rotation), shift, face_vertices)
+    else:
+        pts_world = nodes_local if rotation is None else nodes_local @ rotation.T + translation
+        if center is not None:
+            pts_world = pts_world - center
+        face_vertices = pts_world.astype(np.float32)
+    face_indices = triangles.ravel().astype(np.int32)
+    return face_vertices, face_indices, surface_props, (nodes_local, triangles)
+
+def adaptive_deflection(diagonal, quality=DEFAULT_QUALITY):
+    """Scale linear deflection to the bounding-box diagonal.
+
+    A fixed absolute deflection over-tessellates large parts and produces
+    unusably coarse meshes on small ones; the same diagonal-scaling trick is
+    used for the RANSAC threshold in recognize_shape.
+    """
+    if diagonal <= 0:
+        return 0.1
+    multiplier = QUALITY_MULTIPLIERS.get(quality, QUALITY_MULTIPLIERS[DEFAULT_QUALITY])
+    return max(diagonal * multiplier, 1e-6)
+
+def extract_mesh_data(shape, shape_id=None, quality=DEFAULT_QUALITY):
     """Extract mesh data using an indexed geometry approach and create face maps."""
-    mesh = BRepMesh_IncrementalMesh(shape, 0.1, False, 0.5)
-    mesh.Perform()
-    if not mesh.IsDone(): raise Exception("Meshing failed")
-
-    global_vertices, global_indices, faces_data = [], [], []
-    face_id_by_triangle = []
-    
-    face_index = 0
+    cached_faces = shape_mesh_cache.get(shape_id) if shape_id else None
+    center = shape_center_offset.get(shape_id) if shape_id else None
+    if cached_faces is None:
+        # One bounding-box pass yields both the centering offset and the
+        # adaptive deflection, and the Move-to-origin step is gone entirely.
+        bbox_center, diagonal = shape_bounds(shape)
+        if center is None:
+            center = bbox_center
+            if shape_id:
+                shape_center_offset[shape_id] = center
+        deflection = adaptive_deflection(diagonal, quality)
+        print(f"Meshing with adaptive deflection: {deflection:.4f} (quality={quality})")
+        mesh = BRepMesh_IncrementalMesh(shape, deflection, False, 0.5)
+        mesh.Perform()
+        if not mesh.IsDone(): raise Exception("Meshing failed")
+        cached_faces = {}
+        if shape_id:
+            shape_mesh_cache[shape_id] = cached_faces
+
+    # First pass: collect the face handles so workers don't share the explorer.
+    faces = []
     face_explorer = TopExp_Explorer(shape, TopAbs_FACE)
     while face_explorer.More():
-        face = topods.Face(face_explorer.Current())
-        location = TopLoc_Location()
+        faces.append(topods.Face(face_explorer.Current()))
+        face_explorer.Next()
+
+    # Second pass: per-face extraction in parallel. The triangulations are
+    # already attached to the shape, and OCCT releases the GIL, so this scales
+    # with physical cores on shapes with many faces.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = list(executor.map(
+            lambda args: _process_face(args[1], cached_faces.get(args[0]), center),
+            enumerate(faces)))
+
+    # Third pass: gather per-face blocks, then pack them in one shot.
+    vertex_blocks, index_blocks, faces_data = [], [], []
+    face_props_by_id = {}
+    for face_index, result in enumerate(results):
+        if result is None:
+            continue
+        face_vertices, face_indices, surface_props, local_arrays = result
+        cached_faces[face_index] = local_arrays
         current_face_id = f'face_{face_index}'
-        
-        surface_props = {}
-        adaptor = BRepAdaptor_Surface(face, True)
-        surface_type = adaptor.GetType()
-
-        if surface_type == GeomAbs_Cylinder:
-            cylinder = adaptor.Cylinder()
-            axis = cylinder.Axis()
-            location_cyl = axis.Location()
-            direction = axis.Direction()
-            surface_props = {
-                'surfaceType': 'Cylinder',
-                'radius': cylinder.Radius(),
-                'center': [location_cyl.X(), location_cyl.Y(), location_cyl.Z()],
-                'axis': [direction.X(), direction.Y(), direction.Z()]
-            }
-        elif surface_type == GeomAbs_Plane:
-            surface_props = {'surfaceType': 'Plane'}
-        else:
-            surface_props = {'surfaceType': 'Other'}
-        
-        triangulation = BRep_Tool.Triangulation(face, location)
-
-        if triangulation:
-            transform = location.Transformation()
-            face_vertices, face_indices, vertex_map = [], [], {}
-            for i in range(triangulation.NbTriangles()):
-                triangle = triangulation.Triangle(i + 1)
-                n1, n2, n3 = triangle.Get()
-                for node_index in [n1, n2, n3]:
-                    if node_index not in vertex_map:
-                        new_local_index = len(face_vertices)
-                        vertex_map[node_index] = new_local_index
-                        pnt = triangulation.Node(node_index)
-                        pnt.Transform(transform)
-                        face_vertices.append([pnt.X(), pnt.Y(), pnt.Z()])
-                    face_indices.append(vertex_map[node_index])
-            
-            num_triangles_in_face = triangulation.NbTriangles()
-            face_id_by_triangle.extend([current_face_id] * num_triangles_in_face)
-            
-            face_data = {
-                'id': current_face_id, 'vertices': face_vertices, 'indices': face_indices,
-                'vertexCount': len(face_vertices), 'triangleCount': num_triangles_in_face
-            }
-            face_data.update(surface_props)
-            faces_data.append(face_data)
 
-            offset = len(global_vertices)
-            global_vertices.extend(face_vertices)
-            global_indices.extend([i + offset for i in face_indices])
-        face_explorer.Next()
-        face_index += 1
+        num_triangles_in_face = len(face_indices) // 3
+
+        face_data = {
+            'id': current_face_id, 'vertices': face_vertices.tolist(), 'indices': face_indices.tolist(),
+            'vertexCount': len(face_vertices), 'triangleCount': num_triangles_in_face
+        }
+        face_data.update(surface_props)
+        faces_data.append(face_data)
+        face_props_by_id[current_face_id] = {'props': surface_props, 'vertices': face_vertices}
+
+        vertex_blocks.append(face_vertices)
+        index_blocks.append(face_indices)
+
+    return _assemble_bundle(shape_id, vertex_blocks, index_blocks, faces_data, face_props_by_id)
+
+def _assemble_bundle(shape_id, vertex_blocks, index_blocks, faces_data, face_props_by_id):
+    """Pack per-face blocks into a mesh bundle (shared with the analytic primitives)."""
+    if shape_id:
+        shape_faces_cache[shape_id] = face_props_by_id
+
+    # Pack once into contiguous typed buffers. The NumPy arrays stay in the
+    # bundle; mesh_to_json / mesh_to_binary convert at the response boundary.
+    global_vertices, global_indices = _pack_faces(vertex_blocks, index_blocks)
+    if shape_id:
+        _store_mesh_shared(shape_id, global_vertices, global_indices)
+
+    # One int per triangle plus a small string table, instead of a duplicated
+    # Python string per triangle; clients look up faceIds[faceIndexByTriangle[t]].
+    triangle_counts = [fd['triangleCount'] for fd in faces_data]
+    face_index_by_triangle = np.repeat(np.arange(len(faces_data), dtype=np.int32), triangle_counts)
+    face_ids = [fd['id'] for fd in faces_data]
 
-    flat_vertices = [coord for vertex in global_vertices for coord in vertex]
     return {
-        "id": shape_id, "vertices": flat_vertices, "indices": global_indices,
-        "faces": faces_data, "faceIdByTriangle": face_id_by_triangle,
+        "id": shape_id, "vertices": global_vertices, "indices": global_indices,
+        "faces": faces_data, "faceIndexByTriangle": face_index_by_triangle,
+        "faceIds": face_ids,
         "vertexCount": len(global_vertices), "triangleCount": len(global_indices) // 3,
         "faceCount": len(faces_data)
     }
 
-def process_step_file(file_path):
+def _primitive_face(face_index, vertices, indices, surface_props):
+    """Build one face_data entry for an analytically synthesized primitive."""
+    face_data = {
+        'id': f'face_{face_index}', 'vertices': vertices.tolist(), 'indices': indices.tolist(),
+        'vertexCount': len(vertices), 'triangleCount': len(indices) // 3
+    }
+    face_data.update(surface_props)
+    return face_data
+
+def synthesize_box_mesh(width, height, depth, shape_id):
+    """Synthesize the exact box tessellation (12 triangles) without running BRepMesh."""
+    hw, hh, hd = width / 2.0, height / 2.0, depth / 2.0
+    quads = [
+        [(-hw, -hh, -hd), (-hw, hh, -hd), (-hw, hh, hd), (-hw, -hh, hd)],  # -X
+        [(hw, -hh, -hd), (hw, hh, -hd), (hw, hh, hd), (hw, -hh, hd)],      # +X
+        [(-hw, -hh, -hd), (hw, -hh, -hd), (hw, -hh, hd), (-hw, -hh, hd)],  # -Y
+        [(-hw, hh, -hd), (hw, hh, -hd), (hw, hh, hd), (-hw, hh, hd)],      # +Y
+        [(-hw, -hh, -hd), (hw, -hh, -hd), (hw, hh, -hd), (-hw, hh, -hd)],  # -Z
+        [(-hw, -hh, hd), (hw, -hh, hd), (hw, hh, hd), (-hw, hh, hd)],      # +Z
+    ]
+    quad_indices = np.array([0, 1, 2, 0, 2, 3], dtype=np.int32)
+    vertex_blocks, index_blocks, faces_data, face_props_by_id = [], [], [], {}
+    for i, corners in enumerate(quads):
+        face_vertices = np.array(corners, dtype=np.float32)
+        face_data = _primitive_face(i, face_vertices, quad_indices, {'surfaceType': 'Plane'})
+        faces_data.append(face_data)
+        face_props_by_id[face_data['id']] = {'props': {'surfaceType': 'Plane'}, 'vertices': face_vertices}
+        vertex_blocks.append(face_vertices)
+        index_blocks.append(quad_indices)
+    # MakeBox spans 0..dim on each axis; record the same centering offset
+    # extract_mesh_data would have derived so transforms stay consistent
+    shape_center_offset[shape_id] = np.array([hw, hh, hd])
+    return _assemble_bundle(shape_id, vertex_blocks, index_blocks, faces_data, face_props_by_id)
+
+def synthesize_cylinder_mesh(radius, height, shape_id, quality=DEFAULT_QUALITY):
+    """Synthesize a parametric cylinder tessellation without running BRepMesh."""
+    diagonal = math.sqrt(8.0 * radius ** 2 + height ** 2)
+    deflection = adaptive_deflection(diagonal, quality)
+    if deflection < radius:
+        # Segment count so the chord error stays within the adaptive deflection
+        segments = max(12, int(math.ceil(math.pi / math.acos(1.0 - deflection / radius))))
+    else:
+        segments = 12
+    half_height = height / 2.0
+    theta = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False)
+    ring = np.column_stack([radius * np.cos(theta), radius * np.sin(theta)])
+    k = np.arange(segments, dtype=np.int32)
+    k_next = ((k + 1) % segments).astype(np.int32)
+
+    vertex_blocks, index_blocks, faces_data, face_props_by_id = [], [], [], {}
+
+    # face_0: lateral surface, two rings stitched with 2*segments triangles
+    side_vertices = np.concatenate([
+        np.column_stack([ring, np.full(segments, -half_height)]),
+        np.column_stack([ring, np.full(segments, half_height)]),
+    ]).astype(np.float32)
+    side_indices = np.concatenate([
+        np.stack([k, k_next, k + segments], axis=1),
+        np.stack([k_next, k_next + segments, k + segments], axis=1),
+    ]).ravel().astype(np.int32)
+    side_props = {'surfaceType': 'Cylinder', 'radius': float(radius),
+                  'center': [0.0, 0.0, 0.0], 'axis': [0.0, 0.0, 1.0]}
+    face_data = _primitive_face(0, side_vertices, side_indices, side_props)
+    faces_data.append(face_data)
+    face_props_by_id['face_0'] = {'props': side_props, 'vertices': side_vertices}
+    vertex_blocks.append(side_vertices)
+    index_blocks.append(side_indices)
+
+    # face_1 / face_2: end caps as triangle fans around the axis point
+    fan_indices = np.stack(
+        [k, k_next, np.full(segments, segments, dtype=np.int32)], axis=1).ravel().astype(np.int32)
+    for face_index, sign in ((1, -1.0), (2, 1.0)):
+        cap_vertices = np.concatenate([
+            np.column_stack([ring, np.full(segments, sign * half_height)]),
+            [[0.0, 0.0, sign * half_height]],
+        ]).astype(np.float32)
+        face_data = _primitive_face(face_index, cap_vertices, fan_indices, {'surfaceType': 'Plane'})
+        faces_data.append(face_data)
+        face_props_by_id[face_data['id']] = {'props': {'surfaceType': 'Plane'}, 'vertices': cap_vertices}
+        vertex_blocks.append(cap_vertices)
+        index_blocks.append(fan_indices)
+
+    # MakeCylinder spans z in 0..height around the origin axis
+    shape_center_offset[shape_id] = np.array([0.0, 0.0, half_height])
+    return _assemble_bundle(shape_id, vertex_blocks, index_blocks, faces_data, face_props_by_id)
+
+# LRU of primitive meshes keyed by (type, rounded params, quality). The
+# parameters fully determine the tessellation, so identical requests reuse the
+# same buffers instead of re-running BRepMesh.
+PRIMITIVE_CACHE_SIZE = 32
+_primitive_mesh_cache = OrderedDict()
+
+def cached_primitive_mesh(cache_key, shape, shape_id, builder):
+    """Mesh a primitive via builder(), reusing cached buffers for identical parameters."""
+    cached = _primitive_mesh_cache.get(cache_key)
+    if cached is not None:
+        _primitive_mesh_cache.move_to_end(cache_key)
+        print(f"Primitive mesh cache hit: {cache_key}")
+        # Seed the centering offset and face-props cache so the twin shape
+        # behaves exactly like the first one (transform pivot, analytic
+        # recognition fast path)
+        shape_center_offset[shape_id] = shape_bounds(shape)[0]
+        shape_faces_cache[shape_id] = cached['faceProps']
+        mesh_data = dict(cached)
+        mesh_data['id'] = shape_id
+        del mesh_data['faceProps']
+        return mesh_data
+    mesh_data = builder()
+    # Bundle buffers are private arrays (the shared-memory arena only holds a
+    # mirror), so the cache can reference them directly.
+    cache_entry = dict(mesh_data)
+    cache_entry['faceProps'] = shape_faces_cache.get(shape_id, {})
+    _primitive_mesh_cache[cache_key] = cache_entry
+    if len(_primitive_mesh_cache) > PRIMITIVE_CACHE_SIZE:
+        _primitive_mesh_cache.popitem(last=False)
+    return mesh_data
+
+def mesh_to_json(mesh_data):
+    """Convert a mesh bundle's NumPy buffers into JSON-serializable lists."""
+    json_mesh = {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in mesh_data.items()}
+    json_mesh['vertices'] = mesh_data['vertices'].ravel().tolist()
+    return json_mesh
+
+def mesh_to_binary(mesh_data):
+    """Pack a mesh bundle as [uint32 header length][JSON header][float32 vertices][int32 indices].
+
+    Raw typed buffers avoid ASCII-encoding millions of floats; the client can
+    view them directly as Float32Array / Int32Array.
+    """
+    vertices = np.ascontiguousarray(mesh_data['vertices'], dtype=np.float32)
+    indices = np.ascontiguousarray(mesh_data['indices'], dtype=np.int32)
+    header = {k: v.tolist() if isinstance(v, np.ndarray) else v
+              for k, v in mesh_data.items() if k not in ('vertices', 'indices')}
+    header['vertexBufferLength'] = vertices.nbytes
+    header['indexBufferLength'] = indices.nbytes
+    header_bytes = json.dumps(header).encode('utf-8')
+    return len(header_bytes).to_bytes(4, 'little') + header_bytes + vertices.tobytes() + indices.tobytes()
+
+def wants_binary():
+    """Check whether the client asked for the binary mesh wire format."""
+    return request.args.get('format') == 'binary'
+
+def process_step_file(file_path, quality=DEFAULT_QUALITY):
     """Process STEP/IGES file and extract mesh data with face mapping"""
     print(f"Processing file: {file_path}")
     try:
@@ -189,11 +618,10 @@ def process_step_file(file_path):
         elif file_path.lower().endswith(('.iges', '.igs')): shape = read_iges_file(file_path)
         else: raise Exception("Unsupported file format")
         print("File imported successfully")
-        shape = center_shape(shape)
         shape_id = uuid.uuid4().hex
         scene_objects[shape_id] = shape
         print(f"Stored shape with ID: {shape_id}")
-        mesh_data = extract_mesh_data(shape, shape_id)
+        mesh_data = extract_mesh_data(shape, shape_id, quality)
         print(f"Tessellation complete: {mesh_data['triangleCount']} triangles")
         return [mesh_data]
     except Exception as e:
@@ -201,15 +629,72 @@ def process_step_file(file_path):
         traceback.print_exc()
         raise e
 
+def _analytic_cylinder(shape_id, face_ids):
+    """Recover cylinder parameters from cached BRepAdaptor surface data, if possible.
+
+    STEP-imported cylindrical faces already carry exact center/axis/radius from
+    extract_mesh_data, so there is nothing for RANSAC to estimate. Returns the
+    response dict, or None when the selection is not a single analytic cylinder.
+    """
+    cached = shape_faces_cache.get(shape_id)
+    if not cached or not face_ids:
+        return None
+    entries = [cached.get(fid) for fid in face_ids]
+    if any(entry is None for entry in entries):
+        return None
+    props = [entry['props'] for entry in entries]
+    # Planar faces (end caps) are fine alongside the lateral surface — they
+    # only contribute to the height extent. Anything else is not analytic.
+    cyl_props = [p for p in props if p.get('surfaceType') == 'Cylinder']
+    if not cyl_props:
+        return None
+    if any(p.get('surfaceType') not in ('Cylinder', 'Plane') for p in props):
+        return None
+
+    # All cylindrical faces must agree on one axis (within ~2.5 degrees) and radius (1%)
+    axes = np.array([p['axis'] for p in cyl_props], dtype=np.float64)
+    axes /= np.linalg.norm(axes, axis=1, keepdims=True)
+    ref_axis = axes[0]
+    if np.any(np.abs(axes @ ref_axis) < 0.999):
+        return None
+    radii = np.array([p['radius'] for p in cyl_props], dtype=np.float64)
+    if np.any(np.abs(radii - radii[0]) > 0.01 * radii[0]):
+        return None
+
+    # Height and final center from every selected face's tessellation extents,
+    # caps included
+    points = np.concatenate([entry['vertices'] for entry in entries], axis=0).astype(np.float64)
+    center_pt = np.array(cyl_props[0]['center'], dtype=np.float64)
+    distances = points @ ref_axis - center_pt @ ref_axis
+    min_dist, max_dist = distances.min(), distances.max()
+    final_center = center_pt + ref_axis * ((min_dist + max_dist) / 2.0)
+    return {
+        'success': True,
+        'shape': 'Cylinder',
+        'center': final_center.tolist(),
+        'axis': ref_axis.tolist(),
+        'radius': float(radii.mean()),
+        'height': float(max_dist - min_dist),
+        'method': 'analytic'
+    }
+
 # --- NEW RANSAC ENDPOINT ---
 @app.route('/api/recognize-shape', methods=['POST'])
 def recognize_shape():
-    """Recognize a shape from a point cloud using RANSAC with an adaptive threshold."""
-    if Cylinder is None:
-        return jsonify({'success': False, 'error': 'pyransac3d is not installed on the server.'}), 500
-        
+    """Recognize a shape analytically when possible, falling back to RANSAC."""
     try:
         data = request.get_json()
+
+        # Fast path: the client told us which faces it selected, and the STEP
+        # importer already classified them — answer in O(faces), not O(iterations).
+        analytic = _analytic_cylinder(data.get('shapeId'), data.get('faceIds'))
+        if analytic is not None:
+            print(f"✅ Analytic cylinder from cached face data. Radius: {analytic['radius']:.2f}, Height: {analytic['height']:.2f}")
+            return jsonify(analytic)
+
+        if Cylinder is None:
+            return jsonify({'success': False, 'error': 'pyransac3d is not installed on the server.'}), 500
+
         points_flat = data.get('points', [])
         if not points_flat:
             return jsonify({'success': False, 'error': 'No points provided'}), 400
@@ -240,11 +725,12 @@ def recognize_shape():
         # Ensure the axis vector is a unit vector for stable calculations
         axis_normalized = axis / np.linalg.norm(axis)
 
-        # The rest of the logic for calculating height and final center is the same
+        # Project inliers onto the axis without materializing the (N,3)
+        # vec_from_center temporary: subtract the scalar projection of the
+        # center after the matmul instead.
         inlier_points = points[inliers_indices]
-        vec_from_center = inlier_points - center
-        distances = np.dot(vec_from_center, axis_normalized)
-        
+        distances = inlier_points @ axis_normalized - np.dot(center, axis_normalized)
+
         min_dist = np.min(distances)
         max_dist = np.max(distances)
         height = max_dist - min_dist
@@ -275,12 +761,16 @@ def create_box():
         width,height,depth = data.get('width',10), data.get('height',10), data.get('depth',10)
         print(f"Creating box with dimensions: {width}x{height}x{depth}")
         box_shape = BRepPrimAPI_MakeBox(width, height, depth).Shape()
-        box_shape = center_shape(box_shape)
         shape_id = uuid.uuid4().hex
         scene_objects[shape_id] = box_shape
         print(f"Stored new box shape with ID: {shape_id}")
-        mesh_data = extract_mesh_data(box_shape, shape_id)
-        return jsonify({'success': True, 'message': 'Box created successfully', 'mesh': mesh_data})
+        quality = data.get('quality', DEFAULT_QUALITY)
+        cache_key = ('box', round(width, 6), round(height, 6), round(depth, 6), quality)
+        mesh_data = cached_primitive_mesh(cache_key, box_shape, shape_id,
+                                          lambda: synthesize_box_mesh(width, height, depth, shape_id))
+        if wants_binary():
+            return Response(mesh_to_binary(mesh_data), mimetype='application/octet-stream')
+        return jsonify({'success': True, 'message': 'Box created successfully', 'mesh': mesh_to_json(mesh_data)})
     except Exception as e:
         print(f"❌ Error in create_box: {e}")
         traceback.print_exc()
@@ -296,12 +786,16 @@ def create_cylinder():
         print(f"Creating cylinder with radius: {radius}, height: {height}")
         ax = gp_Ax2(gp_Pnt(0, 0, 0), gp_Vec(0, 0, 1))
         cylinder_shape = BRepPrimAPI_MakeCylinder(ax, radius, height).Shape()
-        cylinder_shape = center_shape(cylinder_shape)
         shape_id = uuid.uuid4().hex
         scene_objects[shape_id] = cylinder_shape
         print(f"Stored new cylinder shape with ID: {shape_id}")
-        mesh_data = extract_mesh_data(cylinder_shape, shape_id)
-        return jsonify({'success': True, 'message': 'Cylinder created', 'mesh': mesh_data})
+        quality = data.get('quality', DEFAULT_QUALITY)
+        cache_key = ('cylinder', round(radius, 6), round(height, 6), quality)
+        mesh_data = cached_primitive_mesh(cache_key, cylinder_shape, shape_id,
+                                          lambda: synthesize_cylinder_mesh(radius, height, shape_id, quality))
+        if wants_binary():
+            return Response(mesh_to_binary(mesh_data), mimetype='application/octet-stream')
+        return jsonify({'success': True, 'message': 'Cylinder created', 'mesh': mesh_to_json(mesh_data)})
     except Exception as e:
         print(f"❌ Error in create_cylinder: {e}")
         traceback.print_exc()
@@ -315,19 +809,31 @@ def process_step():
     if file.filename == '': return jsonify({'error': 'No file selected'}), 400
     if not allowed_file(file.filename): return jsonify({'error': 'Invalid file type.'}), 400
     filename = secure_filename(file.filename)
-    file_path = os.path.join(UPLOAD_FOLDER, f"{int(time.time())}-{filename}")
+    # Keep the extension so process_step_file can pick the right reader
+    suffix = os.path.splitext(filename)[1].lower()
+    tmp = tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, suffix=suffix, delete=False)
+    file_path = tmp.name
     try:
-        file.save(file_path)
+        # Stream the upload into the temp file in large chunks; OCCT then
+        # reads the same bytes straight back off the page cache.
+        with tmp:
+            shutil.copyfileobj(file.stream, tmp, length=16 << 20)
         file_size = os.path.getsize(file_path)
         print(f"File: {filename}, Size: {file_size} bytes")
-        meshes = process_step_file(file_path)
+        quality = request.args.get('quality', DEFAULT_QUALITY)
+        meshes = process_step_file(file_path, quality)
         total_verts = sum(m['vertexCount'] for m in meshes)
         total_tris = sum(m['triangleCount'] for m in meshes)
         total_faces = sum(m['faceCount'] for m in meshes)
         print(f"✅ Processing complete! Vertices: {total_verts}, Triangles: {total_tris}\n")
+        if wants_binary():
+            # One self-describing record per mesh; the header length prefix
+            # lets the client walk them sequentially.
+            payload = b''.join(mesh_to_binary(m) for m in meshes)
+            return Response(payload, mimetype='application/octet-stream')
         response = {
             'success': True,
-            'data': {'meshes': meshes, 'faces': total_faces,
+            'data': {'meshes': [mesh_to_json(m) for m in meshes], 'faces': total_faces,
                      'statistics': {
                          'totalVertices': total_verts, 'totalTriangles': total_tris,
                          'totalFaces': total_faces, 'fileName': filename, 'fileSize': file_size
@@ -351,19 +857,38 @@ def transform_shape(shape_id):
         shape = scene_objects[shape_id]
         if 'translation' in data:
             t = data['translation']
-            trans = gp_Trsf(); trans.SetTranslation(gp_Vec(t.get('x',0), t.get('y',0), t.get('z',0)))
+            trans = _scratch_trsf()
+            trans.SetTranslation(_scratch_vec(t.get('x',0), t.get('y',0), t.get('z',0)))
             shape.Move(TopLoc_Location(trans))
         if 'rotation' in data:
             r = data['rotation']
-            rot = gp_Trsf(); rot.SetRotation(gp_Ax1(gp_Pnt(0,0,0), gp_Vec(*r['axis'])), math.radians(r.get('angle',0)))
+            rot = _scratch_trsf()
+            # The view-space origin corresponds to the stored centering offset
+            # in model space, so rotate about that point
+            pivot = shape_center_offset.get(shape_id)
+            pivot_pnt = gp_Pnt(float(pivot[0]), float(pivot[1]), float(pivot[2])) if pivot is not None else gp_Pnt(0,0,0)
+            rot.SetRotation(gp_Ax1(pivot_pnt, gp_Vec(*r['axis'])), math.radians(r.get('angle',0)))
             shape.Move(TopLoc_Location(rot))
         scene_objects[shape_id] = shape
         new_mesh_data = extract_mesh_data(shape, shape_id)
-        return jsonify({'success': True, 'mesh': new_mesh_data})
+        if wants_binary():
+            return Response(mesh_to_binary(new_mesh_data), mimetype='application/octet-stream')
+        return jsonify({'success': True, 'mesh': mesh_to_json(new_mesh_data)})
     except Exception as e:
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/shape/<shape_id>', methods=['DELETE'])
+def delete_shape(shape_id):
+    """Remove a shape and release its caches and shared-memory arena."""
+    scene_objects.pop(shape_id, None)
+    invalidate_mesh_cache(shape_id)
+    shape_center_offset.pop(shape_id, None)
+    entry = shape_shm_arenas.pop(shape_id, None)
+    if entry is not None:
+        _release_arena(entry)
+    return jsonify({'success': True})
+
 @app.route('/')
 def index():
     return "PythonOCC Flask Backend is running."
@@ -387,5 +912,11 @@ def test_endpoint(): return jsonify({'message': 'Server is working'})
 def health(): return jsonify({'status': 'healthy'})
 
 if __name__ == '__main__':
+    # Development server only. In production run under gunicorn with ONE
+    # worker and a thread pool: OCCT releases the GIL during meshing, so
+    # threads give real concurrency, while scene_objects and the mesh caches
+    # are per-process — multiple workers would 404 on shapes created by a
+    # sibling worker unless that state is externalized first:
+    #   gunicorn -k gthread -w 1 --threads $(nproc) -t 300 -b 0.0.0.0:3000 --chdir backend occserver:app
     print("🚀 Starting Enhanced Python STEP processing server...")
-    app.run(host='0.0.0.0', port=3000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=3000, debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True)
\ No newline at end of file
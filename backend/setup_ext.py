@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""Build the optional _mesh_ext Cython extension in place:
+
+    python setup_ext.py build_ext --inplace
+"""
+
+from setuptools import Extension, setup
+from Cython.Build import cythonize
+
+setup(
+    name='occserver-mesh-ext',
+    ext_modules=cythonize(
+        [Extension('_mesh_ext', ['_mesh_ext.pyx'],
+                   extra_compile_args=['-O3', '-march=native'])],
+        language_level=3,
+    ),
+)
@@ -39,7 +39,7 @@ function App() {
                 pointCloud.push(...face.vertices.flat());
             }
 
-            const result = await ApiHandler.recognizeShapeFromPoints(pointCloud);
+            const result = await ApiHandler.recognizeShapeFromPoints(pointCloud, selectedShapeId, selectedFaceIds);
             
             if (result.success) {
                 console.log("Recognition successful:", result);
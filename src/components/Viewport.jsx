@@ -91,8 +91,9 @@ export function Viewport({ initialMeshes, onObjectSelected, onFaceSelected, sele
                     onObjectSelected(objectId);
                 } else {
                     const faceIndex = firstIntersected.faceIndex;
-                    const faceId = firstIntersected.object.userData.faceIdByTriangle[faceIndex];
-                    onFaceSelected(faceId); 
+                    const { faceIndexByTriangle, faceIds } = firstIntersected.object.userData;
+                    const faceId = faceIds[faceIndexByTriangle[faceIndex]];
+                    onFaceSelected(faceId);
                 }
             } else {
                 onObjectSelected(null);
@@ -163,7 +164,8 @@ export function Viewport({ initialMeshes, onObjectSelected, onFaceSelected, sele
             mesh.userData.id = meshData.id;
             mesh.userData.isCadObject = true;
             mesh.userData.facesData = meshData.faces;
-            mesh.userData.faceIdByTriangle = meshData.faceIdByTriangle;
+            mesh.userData.faceIndexByTriangle = meshData.faceIndexByTriangle;
+            mesh.userData.faceIds = meshData.faceIds;
             scene.add(mesh);
         });
     // CORRECTED: Removed sceneRefs from dependencies
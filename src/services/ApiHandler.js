@@ -42,11 +42,13 @@ export const ApiHandler = {
     },
 
     // --- NEW FUNCTION for RANSAC ---
-    async recognizeShapeFromPoints(points) {
+    async recognizeShapeFromPoints(points, shapeId = null, faceIds = null) {
+        // shapeId/faceIds let the server answer analytically from its cached
+        // surface data; the point cloud is the RANSAC fallback.
         const response = await fetch('http://localhost:3000/api/recognize-shape', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ points }),
+            body: JSON.stringify({ points, shapeId, faceIds }),
         });
         // The response might be a 500 if RANSAC fails, so we need to handle it
         const result = await response.json();
@@ -57,7 +57,8 @@ export const MeshFactory = {
             isCadObject: true,
             isSelectable: true,
             faces: meshData.faces, // Store the original face data
-            faceIdByTriangle: meshData.faceIdByTriangle, // Store the lookup map
+            faceIndexByTriangle: meshData.faceIndexByTriangle, // Per-triangle face index
+            faceIds: meshData.faceIds, // Face index -> face id string table
         };
 
         return mesh;